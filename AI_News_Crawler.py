@@ -15,13 +15,45 @@ AI 领域周报生成器
 """
 
 import os
+import re
+import html
+import json
+import tempfile
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
-from email.utils import parsedate_tz, mktime_tz  # 用于解析 RFC 2822 格式的日期（常见于 RSS）
-import feedparser
-from chatbot_oai import BotConfig, ChatBot
+from email.utils import parsedate_to_datetime  # 用于解析 RFC 2822 格式的日期（常见于 RSS）
+# feedparser 与 chatbot_oai（会连带导入 openai）加载较慢，改为在用到的地方再导入，
+# 使仅复用本模块中日期解析、摘要清洗等函数时不必承担这部分启动开销
 
+MAX_FETCH_WORKERS = 8  # 并发抓取 RSS 源的线程数上限（同时也是连接池大小）
+FEED_CACHE_PATH = "./.feed_cache.json"  # 各 RSS 源的 ETag / Last-Modified 及上次解析结果
+SUMMARY_MAX_CHARS = 800  # 每篇摘要保留的最大字符数
+SUMMARY_MAX_RAW_CHARS = SUMMARY_MAX_CHARS * 8  # 清洗前原始摘要的截取长度，足以产出上面的纯文本长度
+MAX_FEED_BYTES = 8 << 20  # 单个 RSS 响应体（解压后）的大小上限，防止异常源占满内存
 
+_TAG_RE = re.compile(r'</?[A-Za-z!?][^>]*>')  # 仅匹配以标签名（或 !、?）开头的标签，保留正文中的比较符号
+_TRUNCATED_TAG_RE = re.compile(r'<[A-Za-z/!][^>]*$')  # 截断处残留在末尾的不完整标签
+
+# 模块级共享的 HTTP 会话：所有抓取复用同一个连接池，同一主机的后续请求可复用已建立的 TCP/TLS 连接；
+# 连接池大小与并发线程数一致，避免并发时连接池溢出而被迫丢弃连接；
+# 服务端临时错误（5xx）由适配器按指数退避自动重试，复用同一连接池；
+# 不遵循 Retry-After 头，避免维护中的源返回很长的等待时间而拖住整个抓取流程
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=MAX_FETCH_WORKERS,
+    pool_maxsize=MAX_FETCH_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504],
+                      respect_retry_after_header=False),
+)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+
+@lru_cache(maxsize=2048)  # 同一源的条目常共用相同的日期字符串，结果为不可变对象，可安全缓存
 def parse_rss_date(date_str):
     """尝试将 RSS 中的日期字符串解析为标准的 datetime 对象（无时区信息，但按 UTC 处理）。
     
@@ -37,82 +69,187 @@ def parse_rss_date(date_str):
     """
     if not date_str:
         return None
+    date_str = date_str.strip()
+
+    # 按字符串形态直接分派到对应的解析器，避免逐个格式试错抛出异常
+    try:
+        if len(date_str) > 4 and date_str[4] == '-':
+            # ISO 8601：以 "YYYY-" 开头，交给 C 实现的 fromisoformat
+            dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        else:
+            # 其余按 RFC 2822 处理（最常见于 RSS）
+            dt = parsedate_to_datetime(date_str)
+    except (TypeError, ValueError):
+        return None  # 格式无法识别
+
+    # 如果解析结果没有时区信息，则默认为 UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    # 转换为 UTC 并去除时区信息（返回无时区对象，但内容是 UTC 时间）
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
 
-    # 首先尝试使用 email.utils 解析 RFC 2822 格式（最常见于 RSS）
+def clean_summary(raw_html: str) -> str:
+    """将 RSS 摘要中的 HTML 片段转为纯文本：去标签、反转义实体、合并空白并截断
+
+    摘要只是短小片段，用正则去标签即可，无需构建完整的文档树；
+    去掉标签后交给大模型的都是正文，不再把 Token 浪费在标记上。
+    """
+    if not raw_html:
+        return ""
+    # 部分源（如 Hugging Face）在摘要中附带全文，先截断再清洗，避免处理最终会被丢弃的内容
+    if len(raw_html) > SUMMARY_MAX_RAW_CHARS:
+        # 截断可能把一个标签切成两半，只在确实截断时去掉末尾那个不完整的标签
+        raw_html = _TRUNCATED_TAG_RE.sub('', raw_html[:SUMMARY_MAX_RAW_CHARS])
+    # 快速路径：不含标签和实体的纯文本摘要（如 arXiv）无需去标签与反转义
+    if '<' not in raw_html and '&' not in raw_html:
+        return ' '.join(raw_html.split())[:SUMMARY_MAX_CHARS]
+    text = html.unescape(_TAG_RE.sub(' ', raw_html))
+    # split() 一次性切分所有空白（含 \n、\r、\t），再以单个空格连接
+    return ' '.join(text.split())[:SUMMARY_MAX_CHARS]
+
+def load_feed_cache(file_path: str = FEED_CACHE_PATH) -> dict:
+    """读取 RSS 条件请求缓存，格式为 {url: {'etag', 'modified', 'articles'}}，文件不存在或损坏时返回空字典"""
     try:
-        parsed_tuple = parsedate_tz(date_str)
-        if parsed_tuple:
-            timestamp = mktime_tz(parsed_tuple)  # 转为 Unix 时间戳（考虑时区）
-            dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
-            return dt.replace(tzinfo=None)  # 返回无时区对象，但内容是 UTC 时间
+        with open(file_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_feed_cache(cache: dict, file_path: str = FEED_CACHE_PATH) -> None:
+    """将 RSS 条件请求缓存写回文件，与 out_put 一样先写临时文件再原子替换，避免留下写了一半的缓存"""
+    dir_name, base_name = os.path.split(os.path.abspath(file_path))
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{base_name}.", suffix=".tmp", dir=dir_name)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.chmod(tmp_path, 0o644)  # mkstemp 默认仅所有者可读写，恢复为普通文件权限
+        os.replace(tmp_path, file_path)
     except Exception:
-        pass  # 若失败，继续尝试其他格式
-
-    # 若上述失败，尝试几种常见的 ISO 格式
-    for fmt in ["%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d %H:%M:%S%z"]:
-        try:
-            dt = datetime.strptime(date_str, fmt)
-            # 如果解析结果没有时区信息，则默认为 UTC
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            # 转换为 UTC 并去除时区信息（保持与上一分支一致）
-            return dt.astimezone(timezone.utc).replace(tzinfo=None)
-        except ValueError:
-            continue  # 格式不匹配，尝试下一个
-
-    # 所有尝试均失败
-    return None
-
-def fetch_rss_feed_entries(rss_source):
-    """从指定的RSS源抓取文章条目列表"""
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def entries_to_articles(feed, cutoff):
+    """将 feedparser 的解析结果转换为 cutoff（naive UTC）之后发布的文章列表（纯数据转换，不涉及网络 I/O）"""
     articles = []
-    for url in rss_source:
-        try:
-            print(f"Fetching: {url}")
-            # 发起 GET 请求获取 RSS 内容，设置超时防止卡死
-            resp = requests.get(url, timeout=10)
-            resp.raise_for_status()  # 若状态码非 2xx 则抛出异常
-            # 使用 feedparser 解析 RSS 内容
-            feed = feedparser.parse(resp.content)
-            # 遍历每篇文章（entry）
-            for entry in feed.entries:
-                # 优先使用 'published'，若无则尝试 'updated'
-                date_str = getattr(entry, 'published', None) or getattr(entry, 'updated', None)
-                pub_date = parse_rss_date(date_str) if date_str else None
-                # 仅保留过去 7 天内的文章（注意：SEVEN_DAYS_AGO 是带时区的，需对齐）
-                if pub_date and pub_date >= SEVEN_DAYS_AGO.replace(tzinfo=None):
-                    title = getattr(entry, 'title', 'No Title').strip()
-                    link = getattr(entry, 'link', '').strip()
-                    # 获取摘要并做简单清洗：去换行、截断
-                    summary = getattr(entry, 'summary', '').strip().replace('\n', ' ')[:800]
-                    source = getattr(feed.feed, 'title', 'Unknown Source').strip()
-                    articles.append({
-                        'title': title,
-                        'link': link,
-                        'summary': summary,
-                        'source': source,
-                        'published': pub_date.isoformat()  # 转为 ISO 字符串便于排序和输出
-                    })
-                    
-        except Exception as e:
-            # 捕获任意异常（网络错误、解析失败等），记录日志但不中断整体流程
-            print(f"⚠️ Error fetching {url}: {e}")
-            continue
+    # FeedParserDict 是 dict 子类，直接用 get 取值，省去 getattr 触发的 __getattr__ 间接层
+    source = feed.feed.get('title', 'Unknown Source').strip()
+    # 遍历每篇文章（entry）
+    for entry in feed.entries:
+        # 优先使用 feedparser 已解析好的时间（UTC 的 struct_time），省去重复解析
+        parsed = entry.get('published_parsed') or entry.get('updated_parsed')
+        if parsed:
+            pub_date = datetime(*parsed[:6])
+        else:
+            # 优先使用 'published'，若无则尝试 'updated'
+            date_str = entry.get('published') or entry.get('updated')
+            pub_date = parse_rss_date(date_str) if date_str else None
+        # 仅保留 cutoff 之后的文章（pub_date 为 naive UTC，与 cutoff 对齐）
+        if pub_date and pub_date >= cutoff:
+            title = entry.get('title', 'No Title').strip()
+            link = entry.get('link', '').strip()
+            # 获取摘要并清洗为纯文本：去标签、去换行、截断
+            summary = clean_summary(entry.get('summary', ''))
+            articles.append({
+                'title': title,
+                'link': link,
+                'summary': summary,
+                'source': source,
+                'published': pub_date.isoformat()  # 转为 ISO 字符串便于排序和输出
+            })
+    return articles
+
+def fetch_feed(url, cutoff, cache=None):
+    """抓取并解析单个 RSS 源，返回 cutoff（naive UTC）之后发布的文章列表
+
+    若 cache 中记录了该源上次的 ETag / Last-Modified，则发起条件请求；
+    服务器返回 304 时直接复用上次解析出的文章，省去下载与解析。
+    """
+    if cache is None:
+        cache = {}
+    cached = cache.get(url, {})
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('modified'):
+        headers['If-Modified-Since'] = cached['modified']
+
+    print(f"Fetching: {url}")
+    # 发起 GET 请求获取 RSS 内容，设置超时防止卡死；以流式方式读取，便于限制响应体大小
+    with _SESSION.get(url, headers=headers, timeout=10, stream=True) as resp:
+        if resp.status_code == 304:
+            # 内容未变化：上次的文章即为全部条目，只需按当前时间窗口重新过滤
+            print(f"Not modified: {url}")
+            return [art for art in cached.get('articles', [])
+                    if datetime.fromisoformat(art['published']) >= cutoff]
+        resp.raise_for_status()  # 若状态码非 2xx 则抛出异常
+        # 声明的长度超限时直接放弃，不下载响应体
+        content_length = resp.headers.get('Content-Length')
+        if content_length and content_length.isdigit() and int(content_length) > MAX_FEED_BYTES:
+            raise ValueError(f"RSS 内容过大（{content_length} 字节）")
+        # 直接从底层连接读取（按 Content-Encoding 解压），最多读取上限 + 1 字节以判断是否超限
+        resp.raw.decode_content = True
+        body = resp.raw.read(MAX_FEED_BYTES + 1)
+        if len(body) > MAX_FEED_BYTES:
+            raise ValueError(f"RSS 内容超过 {MAX_FEED_BYTES} 字节上限")
+    # 直接把已下载的字节交给 feedparser，并附上响应的 Content-Type 供其判断编码，
+    # 避免 feedparser 自行发起请求或重新探测
+    import feedparser
+    feed = feedparser.parse(body,
+                            response_headers={'content-type': resp.headers.get('Content-Type', '')})
+    articles = entries_to_articles(feed, cutoff)
+    # 记录本次的校验信息，供下次运行发起条件请求（各线程只写自己的键）
+    cache[url] = {
+        'etag': resp.headers.get('ETag'),
+        'modified': resp.headers.get('Last-Modified'),
+        'articles': articles,
+    }
+    return articles
+
+def fetch_rss_feed_entries(rss_source, cutoff, cache=None):
+    """并发地从指定的RSS源抓取 cutoff（naive UTC）之后发布的文章条目列表
+
+    抓取是纯 I/O 操作，使用线程池同时请求所有源，总耗时由各源耗时之和降为其中的最大值。
+    传入 cache（见 load_feed_cache）时启用条件请求，并将新的校验信息写回其中。
+    """
+    articles = []
+    if not rss_source:
+        return articles
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(rss_source))) as executor:
+        futures = {executor.submit(fetch_feed, url, cutoff, cache): url for url in rss_source}
+        for future in as_completed(futures):
+            try:
+                articles.extend(future.result())
+            except Exception as e:
+                # 捕获任意异常（网络错误、解析失败等），记录日志但不中断整体流程
+                print(f"⚠️ Error fetching {futures[future]}: {e}")
 
     # 按发布时间倒序排列（最新在前）
     articles.sort(key=lambda x: x['published'], reverse=True)
     return articles
 
 def out_put(content: str, file_path: str = "./output.md")->None:
+    # 先写入同目录下的隐藏临时文件，再用 os.replace 原子替换目标文件，
+    # 中途失败不会留下写了一半的文章（以 . 开头，Jekyll 也不会将其当作文章处理）
+    dir_name, base_name = os.path.split(os.path.abspath(file_path))
+    tmp_path = None
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{base_name}.", suffix=".tmp", dir=dir_name)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
             f.write(content)
+        os.chmod(tmp_path, 0o644)  # mkstemp 默认仅所有者可读写，恢复为普通文件权限
+        os.replace(tmp_path, file_path)
     except Exception as e:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
         raise FileNotFoundError(f"导出文件{file_path}失败：{e}\n")
     else:
         print(f"文件{file_path}生成成功！\n")
 
 if __name__ == "__main__":
+    from chatbot_oai import BotConfig, ChatBot
+
     # 定义要监控的 AI 领域权威博客 RSS 地址列表
     RSS_SOURCE = [
         "https://research.google/blog/rss/",        # Google AI Blog
@@ -124,21 +261,26 @@ if __name__ == "__main__":
     MODULE = "qwen3.6-plus"
     # 计算“7天前”的 UTC 时间点，用于过滤近期文章
     SEVEN_DAYS_AGO = datetime.now(timezone.utc) - timedelta(days=7)
+    # 文章时间统一为 naive UTC，预先转换一次，作为过滤的截止时间传给抓取函数
+    SEVEN_DAYS_AGO_NAIVE = SEVEN_DAYS_AGO.replace(tzinfo=None)
 
     print("正在抓取最近7天的AI前沿文章...")
-    articles = fetch_rss_feed_entries(RSS_SOURCE)
+    feed_cache = load_feed_cache()
+    articles = fetch_rss_feed_entries(RSS_SOURCE, SEVEN_DAYS_AGO_NAIVE, feed_cache)
+    save_feed_cache(feed_cache)
     if not articles:
         raise ValueError("# AI领域最新进展周报\n\n本周无新发布内容。")
     print(f"✅ 共获取 {len(articles)} 篇新文章。\n")
 
     print(f"正在调用 {MODULE}（通过 OpenAI 兼容接口）生成周报...")
-    # 构建提供给大模型的原始上下文
-    content = "以下是过去一周来自 Google AI、OpenAI、DeepMind、Hugging Face 和 BAIR 等顶级 AI 机构的最新文章摘要：\n\n"
+    # 构建提供给大模型的原始上下文（先收集片段再一次性拼接，避免循环中反复 += 复制整个字符串）
+    parts = ["以下是过去一周来自 Google AI、OpenAI、DeepMind、Hugging Face 和 BAIR 等顶级 AI 机构的最新文章摘要：\n\n"]
     for art in articles:
-        content += f"- **{art['title']}** （来源：{art['source']}）\n"
+        parts.append(f"- **{art['title']}** （来源：{art['source']}）\n")
         if art['summary']:
-            content += f"  摘要：{art['summary']}\n"
-        content += f"  链接：{art['link']}\n\n"
+            parts.append(f"  摘要：{art['summary']}\n")
+        parts.append(f"  链接：{art['link']}\n\n")
+    content = "".join(parts)
     # 构造提示词（Prompt），明确要求模型输出结构化、有洞察力的分析
     prompt = ("请基于以下近期 AI 领域的技术博客摘要（含链接），撰写一份名为《AI领域最新进展周报》的报告，要求：\n\n"
         "1. 报告必须使用 Markdown 格式"
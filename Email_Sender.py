@@ -10,7 +10,7 @@
 使用方式：
 - 本地测试：创建`.env`文件并安装`python-dotenv`
 - GitHub Actions：通过secrets注入环境变量
-- 定时任务：配合cron表达式实现周期性执行
+- 定时任务：配合cron表达式实现周期性执行（最新文章自上次推送后未变化时自动跳过）
 
 依赖库：
 - python-dotenv: 环境变量加载（仅本地开发需要）
@@ -18,71 +18,218 @@
 
 import os
 import re
+import sys
+import json
 import logging
 import smtplib
 from datetime import datetime
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from pathlib import Path
+from email.message import EmailMessage
+from email.policy import SMTP
 
 # 配置日志系统
 logging.basicConfig(level=logging.INFO)
 
-def mail_generator() -> tuple[str, str]:
+_POSTS_DIR = os.path.join(os.path.dirname(__file__), "_posts")
+# 上次成功推送的文章状态，用于定时任务在文章未变化时跳过推送
+_STATE_PATH = os.path.join(os.path.dirname(__file__), ".mail_state.json")
+
+# 预编译正则表达式，避免每次调用时在 re 的内部缓存中查找
+_DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2})')  # 文件名中的 YYYY-MM-DD
+_H1_RE = re.compile(r'^#\s+(.+)$', re.MULTILINE)  # Markdown 一级标题
+_SMTP_TIMEOUT = 10  # SMTP连接超时（秒）
+_MAX_8BIT_LINE = 998  # RFC 5322 限制每行最多998字节，超长行的正文不能以8bit直接发送
+_SEP = '-' * 10  # 邮件正文中的分隔线
+_HEAD_CHARS = 4096  # 标题只会出现在文章开头（front matter 或首个一级标题），仅在这部分中查找
+
+def _extract_front_matter_title(head: str) -> str | None:
+    """
+    从文章开头的YAML front matter中读取`title`字段
+
+    front matter 只是首行`---`之后的若干行`key: value`，逐行判断前缀即可，
+    遇到闭合的`---`即停止（与`_strip_front_matter`相同，起止行须整行为`---`，允许行尾空白）；
+    没有 front matter 或其中没有标题时返回None
+    """
+    lines = head.split('\n', 64)  # 最多切分64行，只覆盖front matter区域
+    if lines[0].rstrip() != '---':
+        return None
+    for line in lines[1:]:
+        if line.rstrip() == '---':
+            return None
+        if line.startswith('title:'):
+            return line[6:].strip().strip('\'"')
+    return None
+
+
+def _strip_front_matter(content: str) -> str:
+    """
+    去除文章开头的YAML front matter，返回正文
+
+    front matter 必然从文件开头的`---`行开始，逐行用`str.find`向后定位完整的`---`闭合行即可，
+    只扫描front matter区域；闭合行之后的空行一并去除，格式不完整时原样返回
+    """
+    first_nl = content.find('\n')
+    # 开头一行须为`---`，允许行尾空白
+    if not content.startswith('---') or first_nl == -1 or content[3:first_nl].strip():
+        return content
+    pos = first_nl + 1
+    while True:
+        nl = content.find('\n', pos)
+        if nl == -1:
+            return content
+        if content[pos:nl].rstrip() == '---':  # 闭合行须整行为`---`（允许行尾空白）
+            break
+        pos = nl + 1
+    # 跳过闭合行之后紧跟的空行
+    start = nl + 1
+    while True:
+        nl = content.find('\n', start)
+        if nl == -1 or content[start:nl].strip():
+            return content[start:]
+        start = nl + 1
+
+
+def latest_post_path() -> str:
+    """
+    返回`_posts`目录中最新发布的Markdown文件路径
+
+    按照文件名中的日期（YYYY-MM-DD格式）比较，取最新的文件
+    """
+    if not os.path.exists(_POSTS_DIR): raise ValueError("_posts目录不存在")
+
+    # 提取文件名中的日期作为比较键
+    def extract_date(filename)->str:
+        # Jekyll 文章名以 YYYY-MM-DD- 开头，直接截取前缀即可
+        if filename[:4].isdigit() and filename[4:5] == '-' and filename[7:8] == '-':
+            return filename[:10]
+        # 形态不符时再回退到正则，尝试提取YYYY-MM-DD格式的日期
+        match = _DATE_RE.search(filename)
+        if not match: raise ValueError("提取日期为空")
+        return match.group(1)
+    # 单次遍历目录取日期最大的.md文件，无需构建列表再整体排序
+    with os.scandir(_POSTS_DIR) as it:
+        latest_file = max((e.name for e in it if e.name.endswith(".md") and e.is_file()),
+                          key=extract_date, default=None)
+    if not latest_file: raise ValueError("_posts目录中没有找到Markdown文件")
+    return os.path.join(_POSTS_DIR, latest_file)
+
+
+def load_mail_state() -> dict:
+    """
+    读取上次成功推送时记录的文章状态，不存在或损坏时返回空字典
+    """
+    try:
+        with open(_STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def post_state(file_path: str) -> dict:
+    """
+    记录`_posts`目录与指定文章的修改时间，用于判断下次运行时是否有变化
+    """
+    return {
+        "posts_mtime_ns": os.stat(_POSTS_DIR).st_mtime_ns,
+        "latest_file": os.path.basename(file_path),
+        "mtime_ns": os.stat(file_path).st_mtime_ns,
+    }
+
+
+def mail_generator(file_path: str | None = None) -> tuple[str, str]:
     """
     从本地`_posts`目录获取最新发布的Markdown文件内容
     
-    按照文件名中的日期（YYYY-MM-DD格式）排序，取最新的文件
+    未指定file_path时按照文件名中的日期（YYYY-MM-DD格式）比较，取最新的文件
     """
     try:
-        # 获取_posts目录下的所有.md文件
-        posts_dir = os.path.join(os.path.dirname(__file__), "_posts")
-        if not os.path.exists(posts_dir): raise ValueError("_posts目录不存在")
-        md_files = [f for f in os.listdir(posts_dir) if f.endswith(".md")]  # 注意这行代码
-        if not md_files: raise ValueError("_posts目录中没有找到Markdown文件")
-        
-        # 按日期排序（从文件名中提取YYYY-MM-DD）并取最新的文件
-        # 重写排序函数
-        def extract_date(filename)->str:
-            # 尝试提取YYYY-MM-DD格式的日期
-            match = re.search(r'(\d{4}-\d{2}-\d{2})', filename)
-            if not match: raise ValueError("提取日期为空")
-            return match.group(1)
-        md_files.sort(key=extract_date, reverse=True)
-        latest_file = md_files[0]
-        file_path = os.path.join(posts_dir, latest_file)
-
-        # 读取文件内容
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        if file_path is None:
+            file_path = latest_post_path()
+        latest_file = os.path.basename(file_path)
+
+        # 读取文件内容（按字节一次读入后整体解码，省去文本模式逐块解码与换行转换）
+        content = Path(file_path).read_bytes().decode('utf-8')
         logging.info(f"已读取最新文章: {latest_file}")
 
-        # 提取文章标题（支持Jekyll/YAML front matter）
-        re_content = re.search(r'title:\s*[\'\"]?(.+?)[\'\"]?\s*$', content, re.MULTILINE)
-        if re_content:
-            title = re_content.group(1).strip()
-        else:
+        # 提取文章标题（支持Jekyll/YAML front matter），只扫描开头部分，避免在长文全文上执行正则
+        head = content[:_HEAD_CHARS]
+        title = _extract_front_matter_title(head)
+        if not title:
             # 如果没有YAML格式中的标题，则尝试从原文获得标题
-            h1_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
+            h1_match = _H1_RE.search(head)
             title = h1_match.group(1).strip() if h1_match else "未命名文章"
-        body = re.sub(r'^---\s*\n.*?\n---\s*\n', '', content, flags=re.DOTALL)
+        body = _strip_front_matter(content)
         title = f"文章：{title}生成成功"
-        body = f"""来自 https://github.com/axwhizee/axwhizee.github.io 的最新文章已生成成功！
-时间：{datetime.now().strftime('%Y年%m月%d日')}\n全文如下：\n
-""" + f"{'-'*10}\n\n{body}"
+        # 相邻的字符串字面量在编译期合并为一个f-string，只拼接一次全文
+        body = (
+            "来自 https://github.com/axwhizee/axwhizee.github.io 的最新文章已生成成功！\n"
+            f"时间：{datetime.now():%Y年%m月%d日}\n全文如下：\n\n"
+            f"{_SEP}\n\n{body}"
+        )
         return title, body
     except Exception as e:
         logging.error(f"读取最新文章时发生错误: {e}")
         raise
 
 
-def send_email(to_email: str, subject: str, body: str) -> None:
+def _starttls_connect(smtp_server: str, port: int) -> smtplib.SMTP:
+    """
+    建立明文SMTP连接并通过STARTTLS升级为加密连接
+    """
+    server = smtplib.SMTP(smtp_server, port, timeout=_SMTP_TIMEOUT)
+    try:
+        server.ehlo()
+        server.starttls()
+        server.ehlo()
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def smtp_connect(smtp_server: str, smtp_port: int = 0) -> smtplib.SMTP:
+    """
+    按端口选择传输方式建立SMTP连接（尚未登录）
+
+    465端口使用SSL，其余端口使用STARTTLS；端口为0（未配置）时先尝试465，
+    失败再回退到587的STARTTLS。配置`SMTP_PORT`可跳过探测，省去一次注定失败的握手
+    """
+    if smtp_port == 465:
+        return smtplib.SMTP_SSL(smtp_server, 465, timeout=_SMTP_TIMEOUT)
+    if smtp_port:
+        return _starttls_connect(smtp_server, smtp_port)
+    try:
+        # 探测沿用正常超时，避免TLS握手较慢的仅465服务器被误判后回退到可能不存在的587
+        return smtplib.SMTP_SSL(smtp_server, 465, timeout=_SMTP_TIMEOUT)
+    except (OSError, smtplib.SMTPException):
+        logging.info("SSL连接失败，改用TLS连接...")
+        return _starttls_connect(smtp_server, 587)
+
+
+def build_message(sender_email: str, to_header: str, subject: str, body: str,
+                  eight_bit: bool = False) -> bytes:
+    """
+    构建邮件并一次性序列化为以CRLF换行的字节串，可直接交给`sendmail`
+
+    eight_bit为True时正文以UTF-8原样（8bit）传输，否则使用base64编码
+    """
+    # 纯文本单部分邮件，无需multipart外壳（省去边界生成与额外的头部）
+    msg = EmailMessage(policy=SMTP)
+    msg["From"] = sender_email
+    msg["To"] = to_header
+    msg["Subject"] = subject
+    msg.set_content(body, subtype="plain", charset="utf-8", cte="8bit" if eight_bit else "base64")
+    return msg.as_bytes()
+
+
+def send_email(to_emails: list[str], subject: str, body: str) -> None:
     """ 
     使用SMTP协议发送电子邮件
     
-    凭证信息从环境变量读取，确保安全性
+    凭证信息从环境变量读取，确保安全性；多个收件人共用一次连接、一次登录和一次投递
     
     Args:
-        to_email (str): 收件人邮箱地址
+        to_emails (list[str]): 收件人邮箱地址列表
         subject (str): 邮件主题
         body (str): 邮件正文内容
     
@@ -93,38 +240,36 @@ def send_email(to_email: str, subject: str, body: str) -> None:
     smtp_server = os.getenv("SMTP_SERVER") or SMTP_SERVER
     sender_email = os.getenv("EMAIL_USER") or EMAIL_USER
     password = os.getenv("EMAIL_PASSWORD") or EMAIL_PASSWORD
+    smtp_port = os.getenv("SMTP_PORT") or SMTP_PORT or 0
 
     # 类型收窄
     try:
         if not smtp_server: raise ValueError("缺少: SMTP_SERVER")
         if not sender_email: raise ValueError("缺少: EMAIL_USER")
         if not password: raise ValueError("缺少: EMAIL_PASSWORD")
+        smtp_port = int(smtp_port)
     except Exception as e:
         logging.error(f"SMTP配置不完整或无效: {e}")
         raise
 
-    # 构建邮件内容
-    msg = MIMEMultipart()
-    msg["From"] = sender_email
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg.attach(MIMEText(body, "plain", "utf-8"))
+    if not to_emails: raise ValueError("缺少收件人")
+
+    # 多个收件人时只通过信封投递（相当于密送），避免订阅者之间互相看到地址
+    to_header = to_emails[0] if len(to_emails) == 1 else sender_email
+    # 只有每行都不超过长度限制时，正文才能以8bit发送；按编码后的字节切分，只在实际传输的CR/LF处断行
+    fits_8bit = all(len(line) <= _MAX_8BIT_LINE for line in body.encode("utf-8").splitlines())
 
     # 发送邮件
     try:
         logging.info(f"正在连接SMTP服务器 {smtp_server}")
-        try:    # 先尝试SSL连接，如果失败再尝试TLS（STARTTLS）连接
-            with smtplib.SMTP_SSL(smtp_server, 465, timeout=10) as server:
-                server.login(sender_email, password)
-                server.sendmail(sender_email, to_email, msg.as_string())
-        except:
-            logging.info("SSL连接失败，改用TLS连接...")
-            with smtplib.SMTP(smtp_server, 587, timeout=10) as server:
-                server.ehlo()
-                server.starttls()
-                server.ehlo()
-                server.login(sender_email, password)
-                server.sendmail(sender_email, to_email, msg.as_string())
+        with smtp_connect(smtp_server, smtp_port) as server:
+            server.login(sender_email, password)
+            # 服务器支持8BITMIME时正文直接以UTF-8发送，省去base64编码及约1/3的传输体积；
+            # 邮件只构建并序列化一次，所有收件人共用
+            eight_bit = fits_8bit and server.has_extn("8bitmime")
+            raw = build_message(sender_email, to_header, subject, body, eight_bit)
+            server.sendmail(sender_email, to_emails, raw,
+                            mail_options=["BODY=8BITMIME"] if eight_bit else [])
     except smtplib.SMTPAuthenticationError:
         logging.error("❌ SMTP认证失败，请检查邮箱账号和授权码是否正确")
         raise
@@ -139,6 +284,7 @@ def send_email(to_email: str, subject: str, body: str) -> None:
 
 if __name__ == "__main__":
     SMTP_SERVER = None
+    SMTP_PORT = None
     EMAIL_USER = None
     EMAIL_PASSWORD = None
     RECIPIENT_EMAIL = None
@@ -147,10 +293,29 @@ if __name__ == "__main__":
 
     # 获取最新文章内容
     logging.info("正在从本地 _posts 目录获取最新文章...")
-    subject, body = mail_generator()
+    state = load_mail_state()
+    try:
+        if state.get("latest_file") and os.stat(_POSTS_DIR).st_mtime_ns == state.get("posts_mtime_ns"):
+            # 目录内没有增删文件，最新文章必然还是上次那篇，无需重新扫描目录
+            latest_path = os.path.join(_POSTS_DIR, state["latest_file"])
+        else:
+            latest_path = latest_post_path()
+        current_state = post_state(latest_path)
+    except Exception as e:
+        logging.error(f"读取最新文章时发生错误: {e}")
+        raise
+    if (current_state["latest_file"], current_state["mtime_ns"]) == (state.get("latest_file"), state.get("mtime_ns")):
+        # 最新文章与上次推送时相同且未被修改，跳过读取文件和连接SMTP服务器
+        logging.info(f"📭 最新文章 {current_state['latest_file']} 自上次推送后未变化，跳过本次推送")
+        sys.exit(0)
+    subject, body = mail_generator(latest_path)
     
-    # 发送邮件
+    # 发送邮件（RECIPIENT_EMAIL 可用逗号分隔多个地址）
     to_email=os.getenv("RECIPIENT_EMAIL") or RECIPIENT_EMAIL
     if not to_email: raise ValueError("缺少环境变量: RECIPIENT_EMAIL")
-    send_email(to_email, subject=subject, body=body)
-    # print(f"From: {EMAIL_USER}\nTo: {to_email}:\n{body}")
+    to_emails = [addr.strip() for addr in to_email.split(",") if addr.strip()]
+    send_email(to_emails, subject=subject, body=body)
+    # 推送成功后记录状态，下次运行时据此判断是否需要再次推送
+    with open(_STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(current_state, f)
+    # print(f"From: {EMAIL_USER}\nTo: {to_emails}:\n{body}")